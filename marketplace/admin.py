@@ -22,6 +22,7 @@ from .models import (
 @admin.register(OwnerProfile)
 class OwnerProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'city', 'country')
+    list_select_related = ('user',)
     search_fields = ('user__username', 'city')
 
 
@@ -33,6 +34,7 @@ class CaregiverServiceInline(admin.TabularInline):
 @admin.register(CaregiverProfile)
 class CaregiverProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'city', 'verified', 'rating_average', 'rating_count')
+    list_select_related = ('user',)
     list_filter = ('city', 'verified')
     search_fields = ('user__username', 'city')
     inlines = [CaregiverServiceInline]
@@ -41,6 +43,7 @@ class CaregiverProfileAdmin(admin.ModelAdmin):
 @admin.register(Pet)
 class PetAdmin(admin.ModelAdmin):
     list_display = ('name', 'species', 'owner')
+    list_select_related = ('owner__user',)
     search_fields = ('name', 'owner__user__username')
 
 
@@ -53,23 +56,27 @@ class ServiceTypeAdmin(admin.ModelAdmin):
 @admin.register(ServiceArea)
 class ServiceAreaAdmin(admin.ModelAdmin):
     list_display = ('caregiver', 'city', 'country', 'radius_km')
+    list_select_related = ('caregiver__user',)
     list_filter = ('city', 'country')
 
 
 @admin.register(CaregiverAvailability)
 class CaregiverAvailabilityAdmin(admin.ModelAdmin):
     list_display = ('caregiver', 'weekday', 'start_time', 'end_time', 'is_recurring')
+    list_select_related = ('caregiver__user',)
     list_filter = ('weekday',)
 
 
 @admin.register(TimeOff)
 class TimeOffAdmin(admin.ModelAdmin):
     list_display = ('caregiver', 'date_from', 'date_to', 'reason')
+    list_select_related = ('caregiver__user',)
 
 
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
     list_display = ('owner', 'caregiver', 'service_type', 'start_datetime', 'status', 'payment_status')
+    list_select_related = ('owner__user', 'caregiver__user', 'service_type')
     list_filter = ('status', 'payment_status', 'service_type')
     search_fields = ('owner__user__username', 'caregiver__user__username')
 
@@ -77,31 +84,37 @@ class BookingAdmin(admin.ModelAdmin):
 @admin.register(BookingRecurringRule)
 class BookingRecurringRuleAdmin(admin.ModelAdmin):
     list_display = ('booking', 'recurrence_type', 'is_active')
+    list_select_related = ('booking',)
 
 
 @admin.register(WalkSession)
 class WalkSessionAdmin(admin.ModelAdmin):
     list_display = ('booking', 'started_at', 'ended_at', 'distance_meters')
+    list_select_related = ('booking',)
 
 
 @admin.register(WalkPhoto)
 class WalkPhotoAdmin(admin.ModelAdmin):
     list_display = ('session', 'created_at')
+    list_select_related = ('session',)
 
 
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ('booking', 'rating', 'author', 'target_caregiver')
+    list_select_related = ('booking', 'author', 'target_caregiver__user')
     list_filter = ('rating',)
 
 
 @admin.register(Payout)
 class PayoutAdmin(admin.ModelAdmin):
     list_display = ('caregiver', 'amount', 'currency', 'status', 'paid_at')
+    list_select_related = ('caregiver__user',)
     list_filter = ('status',)
 
 
 @admin.register(TransactionLog)
 class TransactionLogAdmin(admin.ModelAdmin):
     list_display = ('booking', 'user', 'direction', 'amount', 'created_at')
+    list_select_related = ('booking', 'user')
     list_filter = ('direction',)
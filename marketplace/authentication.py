@@ -0,0 +1,51 @@
+"""Token authentication that resolves the caller's profile ids up front."""
+from __future__ import annotations
+
+import uuid
+from typing import Optional
+
+from django.db.models import OuterRef, Subquery
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from .models import CaregiverProfile, OwnerProfile
+
+
+class ProfileTokenAuthentication(TokenAuthentication):
+    """Attach owner_profile_id and caregiver_profile_id to the user in the token lookup query."""
+
+    def authenticate_credentials(self, key):
+        model = self.get_model()
+        try:
+            token = (
+                model.objects.select_related('user')
+                .annotate(
+                    owner_profile_id=Subquery(OwnerProfile.objects.filter(user=OuterRef('user')).values('id')),
+                    caregiver_profile_id=Subquery(CaregiverProfile.objects.filter(user=OuterRef('user')).values('id')),
+                )
+                .get(key=key)
+            )
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        token.user.owner_profile_id = token.owner_profile_id
+        token.user.caregiver_profile_id = token.caregiver_profile_id
+        return (token.user, token)
+
+
+def get_owner_profile_id(user) -> Optional[uuid.UUID]:
+    """Return the user's owner profile id, querying only when authentication did not attach it."""
+    if not hasattr(user, 'owner_profile_id'):
+        user.owner_profile_id = OwnerProfile.objects.filter(user=user).values_list('id', flat=True).first()
+    return user.owner_profile_id
+
+
+def get_caregiver_profile_id(user) -> Optional[uuid.UUID]:
+    """Return the user's caregiver profile id, querying only when authentication did not attach it."""
+    if not hasattr(user, 'caregiver_profile_id'):
+        user.caregiver_profile_id = CaregiverProfile.objects.filter(user=user).values_list('id', flat=True).first()
+    return user.caregiver_profile_id
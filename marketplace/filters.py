@@ -0,0 +1,43 @@
+"""Query parameter filters for the marketplace API."""
+from __future__ import annotations
+
+from decimal import ROUND_CEILING
+
+from django.db.models import Exists, OuterRef
+from django_filters import rest_framework as filters
+
+from .models import CaregiverProfile, CaregiverService
+
+
+class CaregiverFilter(filters.FilterSet):
+    service_type = filters.CharFilter(method='filter_with_services')
+    price_min = filters.NumberFilter(method='filter_with_services')
+    price_max = filters.NumberFilter(method='filter_with_services')
+    min_rating = filters.NumberFilter(method='filter_min_rating')
+
+    class Meta:
+        model = CaregiverProfile
+        fields = ['city', 'accepts_large_dogs']
+
+    def filter_min_rating(self, queryset, name, value):
+        return queryset.filter(rating_average_bp__gte=(value * 100).to_integral_value(ROUND_CEILING))
+
+    def filter_with_services(self, queryset, name, value):
+        # Applied together in filter_queryset.
+        return queryset
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        data = self.form.cleaned_data
+        service_type, price_min, price_max = data.get('service_type'), data.get('price_min'), data.get('price_max')
+        if not (service_type or price_min is not None or price_max is not None):
+            return queryset
+        # One active service must satisfy every service filter; EXISTS avoids join fan-out and DISTINCT.
+        matching_services = CaregiverService.objects.filter(caregiver=OuterRef('pk'), is_active=True)
+        if service_type:
+            matching_services = matching_services.filter(service_type__code=service_type)
+        if price_min is not None:
+            matching_services = matching_services.filter(price_per_unit__gte=price_min)
+        if price_max is not None:
+            matching_services = matching_services.filter(price_per_unit__lte=price_max)
+        return queryset.filter(Exists(matching_services))
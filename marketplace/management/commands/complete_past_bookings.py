@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from marketplace.models import Booking
+
+
+class Command(BaseCommand):
+    help = 'Mark accepted bookings that have already ended as completed.'
+
+    def handle(self, *args, **options):
+        past = Booking.objects.filter(status=Booking.STATUS_ACCEPTED, end_datetime__lte=timezone.now())
+        updated = Booking.bulk_change_status(past, Booking.STATUS_COMPLETED)
+        self.stdout.write(self.style.SUCCESS(f'Completed {updated} bookings'))
@@ -1,8 +1,10 @@
 import random
 from decimal import Decimal
 
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.utils import timezone
 
 from marketplace.models import (
@@ -12,12 +14,14 @@ from marketplace.models import (
     CaregiverService,
     CaregiverAvailability,
     Pet,
+    recalc_min_service_prices,
 )
 
 
 class Command(BaseCommand):
     help = 'Generate demo users, caregivers, pets, and services for exploration.'
 
+    @transaction.atomic
     def handle(self, *args, **options):
         service_types = [
             ('dog_walk', 'Dog Walk'),
@@ -30,55 +34,103 @@ class Command(BaseCommand):
                 defaults={'name': name, 'description': name, 'base_duration_minutes': 60, 'default_base_price': Decimal('20.00')},
             )
 
-        for idx in range(1, 4):
-            owner_user, _ = User.objects.get_or_create(username=f'owner{idx}')
-            owner_user.set_password('password')
-            owner_user.save()
-            OwnerProfile.objects.get_or_create(
-                user=owner_user,
-                defaults={
-                    'phone': '000',
-                    'country': 'US',
-                    'city': 'NYC',
-                    'address_line1': '123 St',
-                    'postal_code': '10000',
-                },
-            )
+        password = make_password('password')
+        owner_users = User.objects.bulk_create(
+            [User(username=f'owner{idx}', password=password) for idx in range(1, 4)],
+            update_conflicts=True,
+            unique_fields=['username'],
+            update_fields=['password'],
+        )
+        OwnerProfile.objects.bulk_create(
+            [
+                OwnerProfile(
+                    user=owner_user,
+                    phone='000',
+                    country='US',
+                    city='NYC',
+                    address_line1='123 St',
+                    postal_code='10000',
+                )
+                for owner_user in owner_users
+            ],
+            ignore_conflicts=True,
+        )
 
-        for idx in range(1, 4):
-            caregiver_user, _ = User.objects.get_or_create(username=f'caregiver{idx}')
-            caregiver_user.set_password('password')
-            caregiver_user.save()
-            caregiver, _ = CaregiverProfile.objects.get_or_create(
-                user=caregiver_user,
-                defaults={
-                    'phone': '111',
-                    'city': 'NYC',
-                    'bio': 'Experienced pet lover',
-                    'years_experience': 2,
-                    'hourly_rate_base': Decimal('18.00'),
-                    'services_offered': ['dog_walk', 'drop_in'],
-                    'max_pets': 2,
-                    'accepts_large_dogs': True,
-                    'gps_radius_km': Decimal('5.0'),
-                },
-            )
-            for service_type in ServiceType.objects.all():
-                CaregiverService.objects.get_or_create(
+        caregiver_users = User.objects.bulk_create(
+            [User(username=f'caregiver{idx}', password=password) for idx in range(1, 4)],
+            update_conflicts=True,
+            unique_fields=['username'],
+            update_fields=['password'],
+        )
+        CaregiverProfile.objects.bulk_create(
+            [
+                CaregiverProfile(
+                    user=caregiver_user,
+                    phone='111',
+                    city='NYC',
+                    bio='Experienced pet lover',
+                    years_experience=2,
+                    hourly_rate_base=Decimal('18.00'),
+                    services_offered=['dog_walk', 'drop_in'],
+                    max_pets=2,
+                    accepts_large_dogs=True,
+                    gps_radius_km=Decimal('5.0'),
+                )
+                for caregiver_user in caregiver_users
+            ],
+            ignore_conflicts=True,
+        )
+        # Conflicting rows keep their existing ids, so reload the profiles before linking services.
+        caregivers = list(CaregiverProfile.objects.filter(user__in=caregiver_users))
+        all_types = list(ServiceType.objects.all())
+        CaregiverService.objects.bulk_create(
+            [
+                CaregiverService(
                     caregiver=caregiver,
                     service_type=service_type,
-                    defaults={'price_per_unit': service_type.default_base_price, 'is_active': True},
+                    price_per_unit=service_type.default_base_price,
+                    is_active=True,
                 )
-            CaregiverAvailability.objects.get_or_create(
-                caregiver=caregiver,
-                weekday=timezone.now().weekday(),
-                defaults={'start_time': timezone.now().time(), 'end_time': (timezone.now() + timezone.timedelta(hours=2)).time()},
+                for caregiver in caregivers
+                for service_type in all_types
+            ],
+            ignore_conflicts=True,
+        )
+        # bulk_create skips the post_save handler that keeps the denormalized price in sync.
+        recalc_min_service_prices(CaregiverProfile.objects.filter(pk__in=[caregiver.pk for caregiver in caregivers]))
+        now = timezone.now()
+        available = set(
+            CaregiverAvailability.objects.filter(caregiver__in=caregivers, weekday=now.weekday()).values_list(
+                'caregiver_id', flat=True
             )
+        )
+        CaregiverAvailability.objects.bulk_create(
+            [
+                CaregiverAvailability(
+                    caregiver=caregiver,
+                    weekday=now.weekday(),
+                    start_time=now.time(),
+                    end_time=(now + timezone.timedelta(hours=2)).time(),
+                )
+                for caregiver in caregivers
+                if caregiver.id not in available
+            ]
+        )
 
-        for owner in OwnerProfile.objects.all():
-            Pet.objects.get_or_create(
-                owner=owner,
-                name=f'{owner.user.username}-pet',
-                defaults={'species': 'dog', 'breed': 'Mix', 'sex': 'M', 'birthdate': timezone.now().date()},
-            )
+        owners = list(OwnerProfile.objects.select_related('user'))
+        existing_pets = set(Pet.objects.filter(owner__in=owners).values_list('owner_id', 'name'))
+        Pet.objects.bulk_create(
+            [
+                Pet(
+                    owner=owner,
+                    name=f'{owner.user.username}-pet',
+                    species='dog',
+                    breed='Mix',
+                    sex='M',
+                    birthdate=now.date(),
+                )
+                for owner in owners
+                if (owner.id, f'{owner.user.username}-pet') not in existing_pets
+            ]
+        )
         self.stdout.write(self.style.SUCCESS('Demo data generated.'))
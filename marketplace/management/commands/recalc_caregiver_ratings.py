@@ -1,12 +1,11 @@
 from django.core.management.base import BaseCommand
 
-from marketplace.models import CaregiverProfile
+from marketplace.models import recalc_all_caregiver_ratings
 
 
 class Command(BaseCommand):
     help = 'Recalculate caregiver rating aggregates based on reviews.'
 
     def handle(self, *args, **options):
-        for caregiver in CaregiverProfile.objects.all():
-            caregiver.recalc_ratings()
-            self.stdout.write(self.style.SUCCESS(f'Updated {caregiver.user.username}'))
+        updated = recalc_all_caregiver_ratings()
+        self.stdout.write(self.style.SUCCESS(f'Updated {updated} caregivers'))
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='caregiverservice',
+            index=models.Index(fields=['caregiver', 'service_type', 'is_active'], name='cg_service_active_idx'),
+        ),
+    ]
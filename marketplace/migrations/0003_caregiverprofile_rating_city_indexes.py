@@ -0,0 +1,34 @@
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0002_caregiverservice_active_index'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='caregiverprofile',
+            index=models.Index(fields=['-rating_average', '-rating_count'], name='cg_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='caregiverprofile',
+            index=models.Index(
+                condition=models.Q(('accepts_large_dogs', True)),
+                fields=['-rating_average', '-rating_count'],
+                name='cg_large_dogs_rating_idx',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='caregiverprofile',
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('city'), name='gin_trgm_ops'),
+                name='cg_city_trgm_idx',
+            ),
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0003_caregiverprofile_rating_city_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='caregiverprofile',
+            name='rating_average_bp',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunSQL(
+            sql='UPDATE marketplace_caregiverprofile SET rating_average_bp = ROUND(rating_average * 100)',
+            reverse_sql='UPDATE marketplace_caregiverprofile SET rating_average = rating_average_bp / 100.0',
+        ),
+        migrations.RemoveIndex(model_name='caregiverprofile', name='cg_rating_idx'),
+        migrations.RemoveIndex(model_name='caregiverprofile', name='cg_large_dogs_rating_idx'),
+        migrations.RemoveField(
+            model_name='caregiverprofile',
+            name='rating_average',
+        ),
+        migrations.AddIndex(
+            model_name='caregiverprofile',
+            index=models.Index(fields=['-rating_average_bp', '-rating_count'], name='cg_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='caregiverprofile',
+            index=models.Index(
+                condition=models.Q(('accepts_large_dogs', True)),
+                fields=['-rating_average_bp', '-rating_count'],
+                name='cg_large_dogs_rating_idx',
+            ),
+        ),
+    ]
@@ -0,0 +1,47 @@
+import marketplace.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0004_caregiverprofile_rating_average_bp'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pet',
+            name='id',
+            field=models.UUIDField(default=marketplace.models.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='id',
+            field=models.UUIDField(default=marketplace.models.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='walksession',
+            name='id',
+            field=models.UUIDField(default=marketplace.models.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='walkphoto',
+            name='id',
+            field=models.UUIDField(default=marketplace.models.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='review',
+            name='id',
+            field=models.UUIDField(default=marketplace.models.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='payout',
+            name='id',
+            field=models.UUIDField(default=marketplace.models.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='transactionlog',
+            name='id',
+            field=models.UUIDField(default=marketplace.models.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0005_timestamped_uuid7_ids'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='booking',
+            name='start_datetime',
+            field=models.DateTimeField(),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='end_datetime',
+            field=models.DateTimeField(),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(
+                condition=models.Q(('status__in', ['pending', 'accepted'])),
+                fields=['caregiver', 'start_datetime', 'end_datetime'],
+                name='booking_active_range_idx',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='caregiveravailability',
+            index=models.Index(
+                fields=['caregiver', 'weekday', 'start_time', 'end_time'],
+                name='cg_availability_window_idx',
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0006_booking_availability_range_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='has_review',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunSQL(
+            sql=(
+                'UPDATE marketplace_booking SET has_review = TRUE '
+                'WHERE id IN (SELECT booking_id FROM marketplace_review)'
+            ),
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations
+
+CREATE_TRIGGERS = """
+CREATE FUNCTION marketplace_review_inserted() RETURNS trigger AS $$
+BEGIN
+    UPDATE marketplace_booking SET has_review = TRUE WHERE id = NEW.booking_id;
+    IF NEW.target_caregiver_id IS NOT NULL THEN
+        -- Integer division rounded half up; recalc_caregiver_ratings reconciles any drift.
+        UPDATE marketplace_caregiverprofile
+        SET rating_average_bp = (rating_average_bp * rating_count + NEW.rating * 100 + (rating_count + 1) / 2)
+                                / (rating_count + 1),
+            rating_count = rating_count + 1
+        WHERE id = NEW.target_caregiver_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION marketplace_review_deleted() RETURNS trigger AS $$
+BEGIN
+    UPDATE marketplace_booking SET has_review = FALSE WHERE id = OLD.booking_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER review_inserted AFTER INSERT ON marketplace_review
+    FOR EACH ROW EXECUTE FUNCTION marketplace_review_inserted();
+CREATE TRIGGER review_deleted AFTER DELETE ON marketplace_review
+    FOR EACH ROW EXECUTE FUNCTION marketplace_review_deleted();
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER review_deleted ON marketplace_review;
+DROP TRIGGER review_inserted ON marketplace_review;
+DROP FUNCTION marketplace_review_deleted();
+DROP FUNCTION marketplace_review_inserted();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0007_booking_has_review'),
+    ]
+
+    operations = [
+        migrations.RunSQL(sql=CREATE_TRIGGERS, reverse_sql=DROP_TRIGGERS),
+    ]
@@ -0,0 +1,55 @@
+import struct
+
+from django.db import migrations, models
+
+
+# Frozen copies of the encoding as of this migration, so later changes to the model helpers cannot alter it.
+def pack_route(points):
+    values = [round(coordinate * 1_000_000) for point in points for coordinate in point[:2]]
+    return struct.pack(f'<{len(values)}i', *values)
+
+
+def unpack_route(data):
+    values = struct.unpack(f'<{len(data) // 4}i', data)
+    return [[values[i] / 1_000_000, values[i + 1] / 1_000_000] for i in range(0, len(values), 2)]
+
+
+def encode_routes(apps, schema_editor):
+    WalkSession = apps.get_model('marketplace', 'WalkSession')
+    sessions = []
+    for session in WalkSession.objects.only('id', 'route_geojson').iterator(chunk_size=500):
+        route = session.route_geojson
+        if isinstance(route, dict):
+            route = route.get('coordinates', [])
+        session.route_encoded = pack_route(route or [])
+        sessions.append(session)
+    WalkSession.objects.bulk_update(sessions, ['route_encoded'], batch_size=500)
+
+
+def decode_routes(apps, schema_editor):
+    WalkSession = apps.get_model('marketplace', 'WalkSession')
+    sessions = []
+    for session in WalkSession.objects.only('id', 'route_encoded').iterator(chunk_size=500):
+        session.route_geojson = unpack_route(bytes(session.route_encoded))
+        sessions.append(session)
+    WalkSession.objects.bulk_update(sessions, ['route_geojson'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0009_caregiverprofile_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='walksession',
+            name='route_encoded',
+            field=models.BinaryField(default=b'', editable=False),
+        ),
+        migrations.RunPython(encode_routes, decode_routes),
+        migrations.RemoveField(
+            model_name='walksession',
+            name='route_geojson',
+        ),
+    ]
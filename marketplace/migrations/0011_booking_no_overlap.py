@@ -0,0 +1,64 @@
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+import marketplace.models
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+from django.db.models import Exists, F, OuterRef
+
+
+def check_no_overlapping_bookings(apps, schema_editor):
+    """Fail with the offending ids instead of a raw database error when existing rows cannot be constrained."""
+    Booking = apps.get_model('marketplace', 'Booking')
+    # TSTZRANGE(start, end) itself errors when end precedes start, so those rows are reported first.
+    inverted = list(
+        Booking.objects.filter(status__in=['pending', 'accepted'], end_datetime__lt=F('start_datetime'))
+        .order_by('caregiver', 'start_datetime')
+        .values_list('pk', flat=True)
+    )
+    if inverted:
+        raise RuntimeError(
+            f'{len(inverted)} pending/accepted bookings end before they start; '
+            f'fix their times before adding booking_no_overlap: {", ".join(map(str, inverted[:20]))}'
+        )
+    active = Booking.objects.filter(status__in=['pending', 'accepted'], end_datetime__gt=F('start_datetime'))
+    clashing = active.filter(
+        caregiver=OuterRef('caregiver'),
+        start_datetime__lt=OuterRef('end_datetime'),
+        end_datetime__gt=OuterRef('start_datetime'),
+    ).exclude(pk=OuterRef('pk'))
+    overlapping = list(active.filter(Exists(clashing)).order_by('caregiver', 'start_datetime').values_list('pk', flat=True))
+    if overlapping:
+        raise RuntimeError(
+            f'{len(overlapping)} pending/accepted bookings overlap another booking of the same caregiver; '
+            f'cancel or reschedule them before adding booking_no_overlap: {", ".join(map(str, overlapping[:20]))}'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0010_walksession_route_encoded'),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        migrations.RunPython(check_no_overlapping_bookings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(
+                condition=models.Q(('status__in', ['pending', 'accepted'])),
+                expressions=[
+                    ('caregiver', '='),
+                    (
+                        marketplace.models.TsTzRange(
+                            'start_datetime',
+                            'end_datetime',
+                            django.contrib.postgres.fields.ranges.RangeBoundary(),
+                        ),
+                        '&&',
+                    ),
+                ],
+                name='booking_no_overlap',
+            ),
+        ),
+    ]
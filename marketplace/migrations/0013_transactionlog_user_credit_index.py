@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0012_review_caregiver_recent_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transactionlog',
+            index=models.Index(
+                condition=models.Q(('direction', 'credit')),
+                fields=['user', 'created_at'],
+                include=['amount'],
+                name='txlog_user_credit_idx',
+            ),
+        ),
+    ]
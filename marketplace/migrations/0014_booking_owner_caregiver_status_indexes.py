@@ -0,0 +1,40 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0013_transactionlog_user_credit_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['owner', 'status'], name='booking_owner_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['caregiver', 'status'], name='booking_caregiver_status_idx'),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='owner',
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='bookings',
+                to='marketplace.ownerprofile',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='caregiver',
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='bookings',
+                to='marketplace.caregiverprofile',
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+from django.db.models import Min, OuterRef, Subquery
+
+
+def backfill_min_service_price(apps, schema_editor):
+    # A frozen copy of models.recalc_min_service_prices, so later changes to it cannot alter this migration.
+    CaregiverProfile = apps.get_model('marketplace', 'CaregiverProfile')
+    CaregiverService = apps.get_model('marketplace', 'CaregiverService')
+    active_services = CaregiverService.objects.filter(caregiver=OuterRef('pk'), is_active=True).order_by()
+    min_price = active_services.values('caregiver').annotate(value=Min('price_per_unit')).values('value')
+    CaregiverProfile.objects.update(min_service_price=Subquery(min_price))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0014_booking_owner_caregiver_status_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='caregiverprofile',
+            name='min_service_price',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(backfill_min_service_price, migrations.RunPython.noop),
+    ]
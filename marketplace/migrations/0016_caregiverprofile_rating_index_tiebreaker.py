@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0015_caregiverprofile_min_service_price'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(model_name='caregiverprofile', name='cg_rating_idx'),
+        migrations.RemoveIndex(model_name='caregiverprofile', name='cg_large_dogs_rating_idx'),
+        migrations.AddIndex(
+            model_name='caregiverprofile',
+            index=models.Index(fields=['-rating_average_bp', '-rating_count', 'id'], name='cg_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='caregiverprofile',
+            index=models.Index(
+                condition=models.Q(('accepts_large_dogs', True)),
+                fields=['-rating_average_bp', '-rating_count', 'id'],
+                name='cg_large_dogs_rating_idx',
+            ),
+        ),
+    ]
@@ -1,8 +1,11 @@
 """Domain models for the pet care marketplace."""
 from __future__ import annotations
 
+import os
+import struct
+import time
 import uuid
-from decimal import Decimal
+from decimal import ROUND_HALF_UP, Decimal
 from typing import Optional
 
 from django.conf import settings
@@ -10,9 +13,40 @@ from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models, transaction
 from django.utils import timezone
-from django.db.models import Avg, Count
-from django.db.models.functions import Coalesce
-from django.contrib.postgres.fields import ArrayField
+from django.db.models import Avg, Count, Exists, Func, Min, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce, Now, Round, Upper
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import ArrayField, DateTimeRangeField, RangeBoundary, RangeOperators
+from django.contrib.postgres.indexes import GinIndex, OpClass
+
+_CENT = Decimal('0.01')
+_ZERO = Decimal('0.00')
+
+
+def uuid7() -> uuid.UUID:
+    """Return a version 7 UUID: a 48-bit millisecond timestamp followed by random bits (RFC 9562)."""
+    timestamp_ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), 'big')
+    value = (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80
+    value |= 0x7 << 76
+    value |= (rand >> 68) << 64
+    value |= 0b10 << 62
+    value |= rand & 0x3FFF_FFFF_FFFF_FFFF
+    return uuid.UUID(int=value)
+
+
+def pack_route(points: list) -> bytes:
+    """Pack [lng, lat] positions as interleaved little-endian int32 micro-degrees."""
+    for lng, lat, *_ in points:
+        if not (-180 <= lng <= 180 and -90 <= lat <= 90):
+            raise ValueError(f'Route position {[lng, lat]} is outside [-180, 180] x [-90, 90] degrees')
+    values = [round(coordinate * 1_000_000) for point in points for coordinate in point[:2]]
+    return struct.pack(f'<{len(values)}i', *values)
+
+
+def unpack_route(data: bytes) -> list[list[float]]:
+    values = struct.unpack(f'<{len(data) // 4}i', data)
+    return [[values[i] / 1_000_000, values[i + 1] / 1_000_000] for i in range(0, len(values), 2)]
 
 
 class BaseModel(models.Model):
@@ -25,6 +59,9 @@ class BaseModel(models.Model):
 
 
 class TimestampedModel(BaseModel):
+    """Timestamped rows are insert-heavy, so their ids are time-ordered to keep B-tree inserts append-only."""
+
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -57,22 +94,48 @@ class CaregiverProfile(BaseModel):
     accepts_large_dogs = models.BooleanField(default=False)
     accepts_aggressive = models.BooleanField(default=False)
     verified = models.BooleanField(default=False)
-    rating_average = models.DecimalField(max_digits=3, decimal_places=2, default=Decimal('0.00'))
+    # Stored in hundredths of a star (450 == 4.50) to keep the column a smallint.
+    # Both rating columns are bumped by the review_inserted trigger (migration 0008).
+    rating_average_bp = models.PositiveSmallIntegerField(default=0)
     rating_count = models.PositiveIntegerField(default=0)
-    gps_radius_km = models.DecimalField(max_digits=5, decimal_places=2, default=Decimal('0.00'))
+    gps_radius_km = models.DecimalField(max_digits=5, decimal_places=2, default=_ZERO)
+    # Also bumped when services, availabilities or reviews change; keys the detail cache.
+    updated_at = models.DateTimeField(auto_now=True)
+    # Cheapest active service price, kept in sync by the CaregiverService signal handler.
+    min_service_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # The id tiebreaker matches the default list ordering, which must be total for stable pages.
+            models.Index(fields=['-rating_average_bp', '-rating_count', 'id'], name='cg_rating_idx'),
+            models.Index(
+                fields=['-rating_average_bp', '-rating_count', 'id'],
+                name='cg_large_dogs_rating_idx',
+                condition=Q(accepts_large_dogs=True),
+            ),
+            # icontains compiles to UPPER(city) LIKE UPPER(%s), which a trigram index can serve.
+            GinIndex(OpClass(Upper('city'), name='gin_trgm_ops'), name='cg_city_trgm_idx'),
+        ]
 
     def __str__(self) -> str:  # pragma: no cover - trivial
         return f"CaregiverProfile({self.user.username})"
 
+    @property
+    def rating_average(self) -> Decimal:
+        return Decimal(self.rating_average_bp).scaleb(-2)
+
     @transaction.atomic
     def recalc_ratings(self) -> None:
         """Recalculate rating aggregates from reviews."""
-        aggregates = Review.objects.filter(target_caregiver=self).aggregate(
-            avg=Coalesce(Avg('rating'), 0), count=Coalesce(Count('id'), 0)
+        aggregates = Review.objects.filter(target_caregiver=self).aggregate(total=Sum('rating'), count=Count('id'))
+        # Exact decimal average rounded half-up, like ROUND() in the review trigger and recalc_all_caregiver_ratings.
+        self.rating_average_bp = (
+            int((Decimal(aggregates['total'] * 100) / aggregates['count']).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+            if aggregates['count']
+            else 0
         )
-        self.rating_average = Decimal(aggregates['avg']).quantize(Decimal('0.01')) if aggregates['avg'] else Decimal('0.00')
         self.rating_count = aggregates['count']
-        self.save(update_fields=['rating_average', 'rating_count'])
+        self.save(update_fields=['rating_average_bp', 'rating_count', 'updated_at'])
 
 
 class Pet(TimestampedModel):
@@ -118,6 +181,7 @@ class CaregiverService(BaseModel):
 
     class Meta:
         unique_together = ('caregiver', 'service_type')
+        indexes = [models.Index(fields=['caregiver', 'service_type', 'is_active'], name='cg_service_active_idx')]
 
     def __str__(self) -> str:  # pragma: no cover
         return f"{self.caregiver} - {self.service_type}"
@@ -141,6 +205,9 @@ class CaregiverAvailability(BaseModel):
 
     class Meta:
         ordering = ['weekday', 'start_time']
+        indexes = [
+            models.Index(fields=['caregiver', 'weekday', 'start_time', 'end_time'], name='cg_availability_window_idx'),
+        ]
 
 
 class TimeOff(BaseModel):
@@ -150,6 +217,11 @@ class TimeOff(BaseModel):
     reason = models.TextField(blank=True)
 
 
+class TsTzRange(Func):
+    function = 'TSTZRANGE'
+    output_field = DateTimeRangeField()
+
+
 class Booking(TimestampedModel):
     STATUS_PENDING = 'pending'
     STATUS_ACCEPTED = 'accepted'
@@ -173,12 +245,13 @@ class Booking(TimestampedModel):
         (PAYMENT_REFUNDED, 'Refunded'),
     ]
 
-    owner = models.ForeignKey(OwnerProfile, on_delete=models.CASCADE, related_name='bookings')
-    caregiver = models.ForeignKey(CaregiverProfile, on_delete=models.CASCADE, related_name='bookings')
+    # Indexed through the (owner, status) and (caregiver, status) composites below.
+    owner = models.ForeignKey(OwnerProfile, on_delete=models.CASCADE, related_name='bookings', db_index=False)
+    caregiver = models.ForeignKey(CaregiverProfile, on_delete=models.CASCADE, related_name='bookings', db_index=False)
     pet = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name='bookings')
     service_type = models.ForeignKey(ServiceType, on_delete=models.CASCADE, related_name='bookings')
-    start_datetime = models.DateTimeField(db_index=True)
-    end_datetime = models.DateTimeField(db_index=True)
+    start_datetime = models.DateTimeField()
+    end_datetime = models.DateTimeField()
     duration_minutes = models.PositiveIntegerField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
     owner_notes = models.TextField(blank=True)
@@ -187,9 +260,32 @@ class Booking(TimestampedModel):
     platform_fee = models.DecimalField(max_digits=10, decimal_places=2)
     caregiver_earnings = models.DecimalField(max_digits=10, decimal_places=2)
     payment_status = models.CharField(max_length=20, choices=PAYMENT_STATUS_CHOICES, default=PAYMENT_PENDING)
+    # Maintained by the review triggers (migration 0008) so validation need not query the review table.
+    has_review = models.BooleanField(default=False)
 
     class Meta:
-        indexes = [models.Index(fields=['status', 'start_datetime'])]
+        indexes = [
+            models.Index(fields=['status', 'start_datetime']),
+            models.Index(fields=['owner', 'status'], name='booking_owner_status_idx'),
+            models.Index(fields=['caregiver', 'status'], name='booking_caregiver_status_idx'),
+            # Serves the overlap check in is_caregiver_available.
+            models.Index(
+                fields=['caregiver', 'start_datetime', 'end_datetime'],
+                name='booking_active_range_idx',
+                condition=Q(status__in=['pending', 'accepted']),
+            ),
+        ]
+        constraints = [
+            # Closes the race between the availability check and the insert.
+            ExclusionConstraint(
+                name='booking_no_overlap',
+                expressions=[
+                    ('caregiver', RangeOperators.EQUAL),
+                    (TsTzRange('start_datetime', 'end_datetime', RangeBoundary()), RangeOperators.OVERLAPS),
+                ],
+                condition=Q(status__in=['pending', 'accepted']),
+            ),
+        ]
 
     ALLOWED_TRANSITIONS = {
         STATUS_PENDING: {STATUS_ACCEPTED, STATUS_REJECTED, STATUS_CANCELLED},
@@ -204,15 +300,28 @@ class Booking(TimestampedModel):
         self.status = new_status
         self.save(update_fields=['status', 'updated_at'])
 
+    @classmethod
+    def bulk_change_status(cls, queryset: models.QuerySet, new_status: str) -> int:
+        """Move every booking in queryset that may transition to new_status with one UPDATE."""
+        allowed_from = [status for status, allowed in cls.ALLOWED_TRANSITIONS.items() if new_status in allowed]
+        return queryset.filter(status__in=allowed_from).update(status=new_status, updated_at=timezone.now())
+
     @transaction.atomic
     def mark_paid(self) -> None:
         if self.payment_status == self.PAYMENT_PAID:
             return
+        # The conditional UPDATE credits the ledger once even when payment callbacks race.
+        updated = (
+            Booking.objects.filter(pk=self.pk)
+            .exclude(payment_status=self.PAYMENT_PAID)
+            .update(payment_status=self.PAYMENT_PAID, updated_at=timezone.now())
+        )
         self.payment_status = self.PAYMENT_PAID
-        self.save(update_fields=['payment_status', 'updated_at'])
+        if not updated:
+            return
         TransactionLog.objects.create(
             booking=self,
-            user=self.caregiver.user,
+            user_id=CaregiverProfile.objects.values_list('user_id', flat=True).get(pk=self.caregiver_id),
             direction=TransactionLog.DIRECTION_CREDIT,
             amount=self.caregiver_earnings,
             description='Booking payout',
@@ -232,13 +341,22 @@ class WalkSession(TimestampedModel):
     started_at = models.DateTimeField(null=True, blank=True)
     ended_at = models.DateTimeField(null=True, blank=True)
     distance_meters = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
-    route_geojson = models.JSONField(default=list)
+    # 8 bytes per GPS point instead of a JSONB array; exposed through route_geojson.
+    route_encoded = models.BinaryField(default=b'', editable=False)
     pee_events = models.PositiveIntegerField(default=0)
     poo_events = models.PositiveIntegerField(default=0)
     food_given = models.BooleanField(default=False)
     water_given = models.BooleanField(default=False)
     notes = models.TextField(blank=True)
 
+    @property
+    def route_geojson(self) -> list[list[float]]:
+        return unpack_route(bytes(self.route_encoded))
+
+    @route_geojson.setter
+    def route_geojson(self, points: list) -> None:
+        self.route_encoded = pack_route(points)
+
 
 class WalkPhoto(TimestampedModel):
     session = models.ForeignKey(WalkSession, on_delete=models.CASCADE, related_name='photos')
@@ -254,12 +372,9 @@ class Review(TimestampedModel):
 
     class Meta:
         ordering = ['-created_at']
-
-    def save(self, *args, **kwargs):
-        is_new = self._state.adding
-        super().save(*args, **kwargs)
-        if is_new and self.target_caregiver:
-            self.target_caregiver.recalc_ratings()
+        indexes = [
+            models.Index(fields=['target_caregiver', '-created_at'], name='review_caregiver_recent_idx'),
+        ]
 
 
 class Payout(TimestampedModel):
@@ -295,6 +410,17 @@ class TransactionLog(TimestampedModel):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     description = models.TextField()
 
+    class Meta:
+        indexes = [
+            # Covers the finance summary credit sums as index-only scans.
+            models.Index(
+                fields=['user', 'created_at'],
+                include=['amount'],
+                name='txlog_user_credit_idx',
+                condition=Q(direction='credit'),
+            ),
+        ]
+
 
 # Utility functions
 
@@ -303,29 +429,59 @@ def is_caregiver_available(
     caregiver: CaregiverProfile,
     start: timezone.datetime,
     end: timezone.datetime,
+    check_overlap: bool = True,
 ) -> bool:
-    """Check recurring availability, time off, and overlapping bookings."""
-    weekday = start.weekday()
-    time_range_ok = caregiver.availabilities.filter(
-        weekday=weekday,
+    """Check recurring availability, time off, and (optionally) overlapping bookings in one query.
+
+    Callers that insert the booking right away can pass check_overlap=False and rely on the
+    booking_no_overlap exclusion constraint instead.
+    """
+    in_window = CaregiverAvailability.objects.filter(
+        caregiver=OuterRef('pk'),
+        weekday=start.weekday(),
         start_time__lte=start.time(),
         end_time__gte=end.time(),
-    ).exists()
-    if not time_range_ok:
-        return False
+    )
+    on_time_off = TimeOff.objects.filter(
+        caregiver=OuterRef('pk'),
+        date_from__lte=start.date(),
+        date_to__gte=end.date(),
+    )
+    filters = [Exists(in_window), ~Exists(on_time_off)]
+    if check_overlap:
+        overlapping = Booking.objects.filter(
+            caregiver=OuterRef('pk'),
+            status__in=[Booking.STATUS_PENDING, Booking.STATUS_ACCEPTED],
+            start_datetime__lt=end,
+            end_datetime__gt=start,
+        )
+        filters.append(~Exists(overlapping))
+    return CaregiverProfile.objects.filter(*filters, pk=caregiver.pk).exists()
+
+
+def recalc_all_caregiver_ratings() -> int:
+    """Recalculate every caregiver's rating aggregates in a single UPDATE statement."""
+    reviews = Review.objects.filter(target_caregiver=OuterRef('pk')).order_by().values('target_caregiver')
+    average_bp = reviews.annotate(
+        value=Cast(Round(Avg('rating') * 100), models.PositiveSmallIntegerField())
+    ).values('value')
+    count = reviews.annotate(value=Count('id')).values('value')
+    return CaregiverProfile.objects.update(
+        rating_average_bp=Coalesce(Subquery(average_bp), 0),
+        rating_count=Coalesce(Subquery(count), 0),
+        updated_at=Now(),
+    )
 
-    if caregiver.time_off.filter(date_from__lte=start.date(), date_to__gte=end.date()).exists():
-        return False
 
-    overlapping = caregiver.bookings.filter(
-        status__in=[Booking.STATUS_PENDING, Booking.STATUS_ACCEPTED],
-        start_datetime__lt=end,
-        end_datetime__gt=start,
-    ).exists()
-    return not overlapping
+def recalc_min_service_prices(profiles: Optional[models.QuerySet] = None) -> int:
+    """Recompute min_service_price (and bump updated_at) for the given profiles (default all) in a single UPDATE."""
+    profiles = CaregiverProfile.objects.all() if profiles is None else profiles
+    active_services = CaregiverService.objects.filter(caregiver=OuterRef('pk'), is_active=True).order_by()
+    min_price = active_services.values('caregiver').annotate(value=Min('price_per_unit')).values('value')
+    return profiles.update(min_service_price=Subquery(min_price), updated_at=Now())
 
 
 def compute_commission(amount: Decimal) -> tuple[Decimal, Decimal]:
-    platform_fee = (amount * settings.PLATFORM_FEE_PERCENT).quantize(Decimal('0.01'))
+    platform_fee = (amount * settings.PLATFORM_FEE_PERCENT).quantize(_CENT)
     caregiver_earnings = amount - platform_fee
     return platform_fee, caregiver_earnings
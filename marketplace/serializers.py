@@ -5,9 +5,11 @@ from decimal import Decimal
 from typing import Any
 
 from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 from rest_framework import serializers
 
+from .authentication import get_caregiver_profile_id
 from .models import (
     Booking,
     CaregiverAvailability,
@@ -24,6 +26,7 @@ from .models import (
     is_caregiver_available,
     compute_commission,
 )
+from .services import get_service_type
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -42,6 +45,7 @@ class OwnerProfileSerializer(serializers.ModelSerializer):
 
 class CaregiverProfileSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
+    rating_average = serializers.DecimalField(max_digits=3, decimal_places=2, read_only=True)
 
     class Meta:
         model = CaregiverProfile
@@ -88,7 +92,11 @@ class CaregiverServiceSerializer(serializers.ModelSerializer):
 
 
 class CaregiverListSerializer(serializers.ModelSerializer):
-    services = CaregiverServiceSerializer(many=True, read_only=True)
+    services = CaregiverServiceSerializer(source='active_services', many=True, read_only=True)
+    rating_average = serializers.DecimalField(max_digits=3, decimal_places=2, read_only=True)
+    min_price = serializers.DecimalField(
+        source='min_service_price', max_digits=10, decimal_places=2, read_only=True, allow_null=True
+    )
 
     class Meta:
         model = CaregiverProfile
@@ -97,6 +105,7 @@ class CaregiverListSerializer(serializers.ModelSerializer):
             'user',
             'city',
             'services',
+            'min_price',
             'rating_average',
             'rating_count',
             'accepts_large_dogs',
@@ -104,7 +113,7 @@ class CaregiverListSerializer(serializers.ModelSerializer):
 
 
 class CaregiverDetailSerializer(CaregiverProfileSerializer):
-    services = CaregiverServiceSerializer(many=True, read_only=True)
+    services = CaregiverServiceSerializer(source='active_services', many=True, read_only=True)
     availabilities = serializers.SerializerMethodField()
     reviews = serializers.SerializerMethodField()
 
@@ -123,7 +132,9 @@ class CaregiverDetailSerializer(CaregiverProfileSerializer):
         ]
 
     def get_reviews(self, obj: CaregiverProfile):
-        reviews = obj.reviews.select_related('author').all()[:10]
+        reviews = getattr(obj, 'top_reviews', None)
+        if reviews is None:
+            reviews = obj.reviews.select_related('author')[:10]
         return [
             {
                 'rating': r.rating,
@@ -166,22 +177,20 @@ class BookingCreateSerializer(serializers.ModelSerializer):
         except Pet.DoesNotExist as exc:
             raise serializers.ValidationError('Pet not found') from exc
 
-        try:
-            caregiver = CaregiverProfile.objects.get(id=attrs['caregiver_id'])
-        except CaregiverProfile.DoesNotExist as exc:
-            raise serializers.ValidationError('Caregiver not found') from exc
-
-        try:
-            service_type = ServiceType.objects.get(code=attrs['service_type_code'])
-        except ServiceType.DoesNotExist as exc:
-            raise serializers.ValidationError('Service type not found') from exc
+        service_type = get_service_type(attrs['service_type_code'])
+        if service_type is None:
+            raise serializers.ValidationError('Service type not found')
 
         try:
-            caregiver_service = CaregiverService.objects.get(
-                caregiver=caregiver, service_type=service_type, is_active=True
+            caregiver_service = CaregiverService.objects.select_related('caregiver').get(
+                caregiver_id=attrs['caregiver_id'], service_type=service_type, is_active=True
             )
         except CaregiverService.DoesNotExist as exc:
+            # Only the failure path pays for telling the two causes apart.
+            if not CaregiverProfile.objects.filter(id=attrs['caregiver_id']).exists():
+                raise serializers.ValidationError('Caregiver not found') from exc
             raise serializers.ValidationError('Caregiver does not offer this service') from exc
+        caregiver = caregiver_service.caregiver
 
         start: timezone.datetime = attrs['start_datetime']
         duration = attrs['duration_minutes']
@@ -193,7 +202,7 @@ class BookingCreateSerializer(serializers.ModelSerializer):
         if duration > service_type.base_duration_minutes * 4:
             raise serializers.ValidationError('Duration exceeds allowed maximum for service type')
 
-        if not is_caregiver_available(caregiver, start, end):
+        if not is_caregiver_available(caregiver, start, end, check_overlap=False):
             raise serializers.ValidationError('Caregiver is not available for the selected time')
 
         platform_fee, caregiver_earnings = compute_commission(caregiver_service.price_per_unit)
@@ -215,7 +224,14 @@ class BookingCreateSerializer(serializers.ModelSerializer):
         validated_data.pop('pet_id', None)
         validated_data.pop('caregiver_id', None)
         validated_data.pop('service_type_code', None)
-        return super().create(validated_data)
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError as exc:
+            # Only a booking_no_overlap violation means a clash; other integrity errors are real bugs.
+            if getattr(getattr(exc.__cause__, 'diag', None), 'constraint_name', None) != 'booking_no_overlap':
+                raise
+            raise serializers.ValidationError('Caregiver is not available for the selected time') from exc
 
 
 class BookingDetailSerializer(serializers.ModelSerializer):
@@ -227,6 +243,8 @@ class BookingDetailSerializer(serializers.ModelSerializer):
     class Meta:
         model = Booking
         fields = '__all__'
+        # Maintained by the review triggers; ReviewSerializer relies on it to reject a second review.
+        read_only_fields = ['has_review']
 
 
 class BookingStatusSerializer(serializers.Serializer):
@@ -240,8 +258,25 @@ class WalkPhotoSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
+class RoutePointField(serializers.ListField):
+    """A [lng, lat] position in degrees, bounded so it fits the packed route encoding."""
+
+    child = serializers.FloatField(min_value=-180, max_value=180)
+
+    def __init__(self, **kwargs):
+        super().__init__(min_length=2, max_length=2, **kwargs)
+
+    def to_internal_value(self, data):
+        point = super().to_internal_value(data)
+        # The length validators run after this, so a short point is left for them to report.
+        if len(point) == 2 and not -90 <= point[1] <= 90:
+            raise serializers.ValidationError('Latitude must be between -90 and 90.')
+        return point
+
+
 class WalkSessionSerializer(serializers.ModelSerializer):
     photos = WalkPhotoSerializer(many=True, read_only=True)
+    route_geojson = serializers.ListField(child=RoutePointField(), required=False)
 
     class Meta:
         model = WalkSession
@@ -261,6 +296,17 @@ class WalkSessionSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is not None and request.user.is_authenticated:
+            # The pk lookup doubles as the ownership check: other caregivers' bookings do not resolve.
+            fields['booking'].queryset = Booking.objects.filter(caregiver_id=get_caregiver_profile_id(request.user))
+        else:
+            # Schema generation introspects the serializer without a logged-in user.
+            fields['booking'].queryset = Booking.objects.none()
+        return fields
+
 
 class ReviewSerializer(serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
@@ -274,7 +320,7 @@ class ReviewSerializer(serializers.ModelSerializer):
         booking: Booking = attrs['booking']
         if booking.status != Booking.STATUS_COMPLETED:
             raise serializers.ValidationError('Reviews are only allowed for completed bookings')
-        if hasattr(booking, 'review'):
+        if booking.has_review:
             raise serializers.ValidationError('A review already exists for this booking')
         attrs['target_caregiver'] = booking.caregiver
         return attrs
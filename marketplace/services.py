@@ -0,0 +1,37 @@
+"""Cached lookups for near-static reference data."""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from django.core.cache import cache
+
+from .models import ServiceType
+
+SERVICE_TYPES_CACHE_KEY = 'service_types_all'
+# With no CACHES setting each worker has its own LocMemCache, and the signal-driven invalidation only clears
+# the worker that handled the write. Other workers may serve deleted or repriced service types until this expires.
+SERVICE_TYPES_CACHE_TIMEOUT = 60
+CAREGIVER_DETAIL_CACHE_TIMEOUT = 5 * 60
+
+
+def get_service_types() -> list[ServiceType]:
+    """Return all service types ordered by name, served from the cache when warm."""
+    return cache.get_or_set(
+        SERVICE_TYPES_CACHE_KEY,
+        lambda: list(ServiceType.objects.order_by('name')),
+        SERVICE_TYPES_CACHE_TIMEOUT,
+    )
+
+
+def get_service_type(code: str) -> Optional[ServiceType]:
+    return next((service_type for service_type in get_service_types() if service_type.code == code), None)
+
+
+def invalidate_service_types() -> None:
+    cache.delete(SERVICE_TYPES_CACHE_KEY)
+
+
+def caregiver_detail_cache_key(caregiver_id, updated_at: datetime) -> str:
+    """Key a rendered caregiver detail on its updated_at so any bump makes the old entry unreachable."""
+    return f'caregiver_detail:{caregiver_id}:{updated_at.timestamp()}'
@@ -0,0 +1,47 @@
+"""Signal handlers keeping cached and denormalized data in sync."""
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import (
+    CaregiverAvailability,
+    CaregiverProfile,
+    CaregiverService,
+    Review,
+    ServiceType,
+    recalc_min_service_prices,
+)
+from .serializers import UserSerializer
+from .services import invalidate_service_types
+
+
+@receiver([post_save, post_delete], sender=ServiceType)
+def service_type_changed(sender, **kwargs):
+    invalidate_service_types()
+
+
+@receiver([post_save, post_delete], sender=CaregiverService)
+def caregiver_service_changed(sender, instance, **kwargs):
+    recalc_min_service_prices(CaregiverProfile.objects.filter(pk=instance.caregiver_id))
+
+
+@receiver([post_save, post_delete], sender=CaregiverAvailability)
+def caregiver_availability_changed(sender, instance, **kwargs):
+    CaregiverProfile.objects.filter(pk=instance.caregiver_id).update(updated_at=timezone.now())
+
+
+@receiver([post_save, post_delete], sender=Review)
+def review_changed(sender, instance, **kwargs):
+    if instance.target_caregiver_id:
+        CaregiverProfile.objects.filter(pk=instance.target_caregiver_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, created, update_fields=None, **kwargs):
+    # Cached caregiver details embed the caregiver's user and each review author's username.
+    # Saves that touch none of the rendered fields, such as the last_login update on login, are skipped.
+    if created or (update_fields is not None and not set(update_fields) & set(UserSerializer.Meta.fields)):
+        return
+    CaregiverProfile.objects.filter(Q(user=instance) | Q(reviews__author=instance)).update(updated_at=timezone.now())
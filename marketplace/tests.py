@@ -1,10 +1,19 @@
+import tempfile
+import uuid
+from io import BytesIO, StringIO
 from datetime import datetime, time, timedelta
 from decimal import Decimal
 
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APIRequestFactory
 
+from .authentication import ProfileTokenAuthentication
 from .models import (
     Booking,
     CaregiverAvailability,
@@ -12,13 +21,45 @@ from .models import (
     CaregiverService,
     OwnerProfile,
     Pet,
+    Review,
     ServiceType,
+    TimeOff,
+    WalkSession,
     compute_commission,
     is_caregiver_available,
+    pack_route,
+    recalc_all_caregiver_ratings,
+    uuid7,
 )
 
 
-class BookingLogicTests(TestCase):
+def _png(name: str) -> SimpleUploadedFile:
+    buffer = BytesIO()
+    Image.new('RGB', (1, 1)).save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class BookingFixturesMixin:
+    """Expects setUp to provide owner, caregiver, pet and service_type."""
+
+    def _booking(self, status=Booking.STATUS_COMPLETED, days_ahead=0):
+        start = timezone.now() + timedelta(days=days_ahead, hours=1)
+        return Booking.objects.create(
+            owner=self.owner,
+            caregiver=self.caregiver,
+            pet=self.pet,
+            service_type=self.service_type,
+            start_datetime=start,
+            end_datetime=start + timedelta(hours=1),
+            duration_minutes=60,
+            status=status,
+            price_subtotal=Decimal('30.00'),
+            platform_fee=Decimal('3.00'),
+            caregiver_earnings=Decimal('27.00'),
+        )
+
+
+class BookingLogicTests(BookingFixturesMixin, TestCase):
     def setUp(self):
         self.owner_user = User.objects.create_user(username='owner', password='pass')
         self.caregiver_user = User.objects.create_user(username='care', password='pass')
@@ -79,6 +120,13 @@ class BookingLogicTests(TestCase):
         end = start + timedelta(hours=1)
         self.assertTrue(is_caregiver_available(self.caregiver, start, end))
 
+    def test_caregiver_unavailable_on_time_off(self):
+        start = timezone.make_aware(datetime.combine(timezone.now().date() + timedelta(days=7), time(10, 0)))
+        end = start + timedelta(hours=1)
+        self.assertTrue(is_caregiver_available(self.caregiver, start, end))
+        TimeOff.objects.create(caregiver=self.caregiver, date_from=start.date(), date_to=start.date())
+        self.assertFalse(is_caregiver_available(self.caregiver, start, end))
+
     def test_booking_creation_and_commission(self):
         start = timezone.now() + timedelta(hours=1)
         end = start + timedelta(hours=1)
@@ -126,3 +174,292 @@ class BookingLogicTests(TestCase):
             booking.change_status(Booking.STATUS_PENDING)
         booking.change_status(Booking.STATUS_COMPLETED)
         self.assertEqual(booking.status, Booking.STATUS_COMPLETED)
+
+    def test_bulk_change_status_skips_disallowed_transitions(self):
+        booking = self._booking()
+        bookings = Booking.objects.filter(pk=booking.pk)
+        self.assertEqual(Booking.bulk_change_status(bookings, Booking.STATUS_CANCELLED), 0)
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, Booking.STATUS_COMPLETED)
+
+    def test_mark_paid_credits_the_caregiver_once(self):
+        booking = self._booking()
+        booking.mark_paid()
+        Booking.objects.get(pk=booking.pk).mark_paid()
+        self.assertEqual(booking.transactions.count(), 1)
+        self.assertEqual(booking.transactions.get().user, self.caregiver_user)
+
+    def test_rating_average_stored_in_hundredths(self):
+        booking = self._booking()
+        Review.objects.create(booking=booking, author=self.owner_user, target_caregiver=self.caregiver, rating=4)
+        self.caregiver.refresh_from_db()
+        self.assertEqual(self.caregiver.rating_average_bp, 400)
+        self.assertEqual(self.caregiver.rating_average, Decimal('4.00'))
+        self.assertEqual(self.caregiver.rating_count, 1)
+        booking.refresh_from_db()
+        self.assertTrue(booking.has_review)
+
+    def test_rating_average_updated_incrementally(self):
+        for rating in (4, 5, 5):
+            booking = self._booking()
+            Review.objects.create(booking=booking, author=self.owner_user, target_caregiver=self.caregiver, rating=rating)
+        self.caregiver.refresh_from_db()
+        self.assertEqual(self.caregiver.rating_count, 3)
+        self.assertEqual(self.caregiver.rating_average_bp, 467)
+
+    def test_recalc_ratings_rounds_half_up_like_the_bulk_recalc(self):
+        for rating in (4, 5, 5, 5, 4, 4, 5, 5):
+            Review.objects.create(
+                booking=self._booking(), author=self.owner_user, target_caregiver=self.caregiver, rating=rating
+            )
+        self.caregiver.recalc_ratings()
+        self.assertEqual(self.caregiver.rating_average_bp, 463)
+        recalc_all_caregiver_ratings()
+        self.caregiver.refresh_from_db()
+        self.assertEqual(self.caregiver.rating_average_bp, 463)
+
+    def test_caregiver_updated_at_bumped_by_service_change(self):
+        before = CaregiverProfile.objects.values_list('updated_at', flat=True).get(pk=self.caregiver.pk)
+        self.caregiver_service.price_per_unit = Decimal('35.00')
+        self.caregiver_service.save()
+        after = CaregiverProfile.objects.values_list('updated_at', flat=True).get(pk=self.caregiver.pk)
+        self.assertGreater(after, before)
+
+    def test_min_service_price_tracks_active_services(self):
+        self.caregiver_service.price_per_unit = Decimal('35.00')
+        self.caregiver_service.save()
+        self.caregiver.refresh_from_db()
+        self.assertEqual(self.caregiver.min_service_price, Decimal('35.00'))
+        self.caregiver_service.is_active = False
+        self.caregiver_service.save()
+        self.caregiver.refresh_from_db()
+        self.assertIsNone(self.caregiver.min_service_price)
+
+    def test_min_service_price_follows_created_and_deleted_services(self):
+        drop_in = ServiceType.objects.create(code='drop_in', name='Drop In', default_base_price=Decimal('15.00'))
+        cheaper = CaregiverService.objects.create(
+            caregiver=self.caregiver, service_type=drop_in, price_per_unit=Decimal('12.50')
+        )
+        self.caregiver.refresh_from_db()
+        self.assertEqual(self.caregiver.min_service_price, Decimal('12.50'))
+        cheaper.delete()
+        self.caregiver.refresh_from_db()
+        self.assertEqual(self.caregiver.min_service_price, Decimal('30.00'))
+
+    def test_generate_dummy_data_sets_min_service_price(self):
+        call_command('generate_dummy_data', stdout=StringIO())
+        seeded = CaregiverProfile.objects.filter(user__username__startswith='caregiver')
+        self.assertEqual(seeded.count(), 3)
+        self.assertFalse(seeded.filter(min_service_price__isnull=True).exists())
+
+    def test_uuid7_is_versioned_and_time_ordered(self):
+        first = uuid7()
+        self.assertEqual(first.version, 7)
+        self.assertEqual(first.variant, uuid.RFC_4122)
+        later = uuid7()
+        self.assertLessEqual(first.int >> 80, later.int >> 80)
+        self.assertIsInstance(self.pet.pk, uuid.UUID)
+        self.assertEqual(self.pet.pk.version, 7)
+
+
+class ApiTests(BookingFixturesMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner_user = User.objects.create_user(username='owner', password='pass')
+        self.caregiver_user = User.objects.create_user(username='care', password='pass')
+        self.owner = OwnerProfile.objects.create(
+            user=self.owner_user, phone='123', country='US', city='NYC', address_line1='1 St', postal_code='00000'
+        )
+        self.caregiver = CaregiverProfile.objects.create(
+            user=self.caregiver_user, phone='555', city='NYC', hourly_rate_base=Decimal('20.00'), accepts_large_dogs=True
+        )
+        self.pet = Pet.objects.create(owner=self.owner, name='Fido', species='dog', sex='M')
+        self.service_type = ServiceType.objects.create(
+            code='dog_walk', name='Dog Walk', default_base_price=Decimal('25.00')
+        )
+        CaregiverService.objects.create(
+            caregiver=self.caregiver, service_type=self.service_type, price_per_unit=Decimal('30.00')
+        )
+        self.booking = self._booking(status=Booking.STATUS_PENDING)
+
+    def test_schema_generates_without_login(self):
+        response = self.client.get('/api/schema/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_walk_route_rejects_out_of_range_coordinates(self):
+        walk = WalkSession.objects.create(booking=self.booking)
+        self.client.force_authenticate(self.caregiver_user)
+        url = f'/api/walks/{walk.pk}/'
+        self.assertEqual(self.client.patch(url, {'route_geojson': [[5000, 40]]}, format='json').status_code, 400)
+        self.assertEqual(self.client.patch(url, {'route_geojson': [[10, 95]]}, format='json').status_code, 400)
+        self.assertEqual(self.client.patch(url, {'route_geojson': [[10]]}, format='json').status_code, 400)
+        response = self.client.patch(url, {'route_geojson': [[-73.985428, 40.748817]]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['route_geojson'], [[-73.985428, 40.748817]])
+        with self.assertRaises(ValueError):
+            pack_route([[5000, 40]])
+
+    def _token_client(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+        return client
+
+    def test_booking_transitions_authorize_by_role(self):
+        stranger = User.objects.create_user(username='stranger', password='pass')
+        OwnerProfile.objects.create(user=stranger, phone='1', country='US', city='NYC', address_line1='x', postal_code='1')
+        base = f'/api/bookings/{self.booking.pk}'
+        self.client.force_authenticate(stranger)
+        self.assertEqual(self.client.post(f'{base}/accept/').status_code, 404)
+        self.client.force_authenticate(self.owner_user)
+        self.assertEqual(self.client.post(f'{base}/accept/').status_code, 403)
+        caregiver = self._token_client(self.caregiver_user)
+        with self.assertNumQueries(2):
+            response = caregiver.post(f'{base}/accept/')
+        self.assertEqual(response.data, {'status': Booking.STATUS_ACCEPTED})
+        self.assertEqual(caregiver.post(f'{base}/reject/').status_code, 400)
+        self.assertEqual(caregiver.post(f'{base}/complete/').status_code, 200)
+        self.assertEqual(self.client.post(f'{base}/cancel/').status_code, 400)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, Booking.STATUS_COMPLETED)
+
+    def test_owner_can_cancel_pending_booking(self):
+        self.client.force_authenticate(self.owner_user)
+        response = self.client.post(f'/api/bookings/{self.booking.pk}/cancel/')
+        self.assertEqual(response.data, {'status': Booking.STATUS_CANCELLED})
+
+    def test_repeat_transition_answers_the_same_with_or_without_as(self):
+        self.client.force_authenticate(self.caregiver_user)
+        url = f'/api/bookings/{self.booking.pk}/accept/'
+        self.assertEqual(self.client.post(url).status_code, 200)
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.assertEqual(self.client.post(url + '?as=caregiver').status_code, 400)
+
+    def test_has_review_is_read_only(self):
+        Booking.objects.filter(pk=self.booking.pk).update(has_review=True)
+        self.client.force_authenticate(self.owner_user)
+        response = self.client.patch(f'/api/bookings/{self.booking.pk}/', {'has_review': False}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.booking.refresh_from_db()
+        self.assertTrue(self.booking.has_review)
+
+    def test_caregiver_detail_cache_follows_username_change(self):
+        url = f'/api/caregivers/{self.caregiver.pk}/'
+        self.assertEqual(self.client.get(url).data['user']['username'], 'care')
+        self.caregiver_user.username = 'renamed'
+        self.caregiver_user.save()
+        self.assertEqual(self.client.get(url).data['user']['username'], 'renamed')
+
+    def test_token_authentication_attaches_profile_ids(self):
+        token = Token.objects.create(user=self.caregiver_user)
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Token {token.key}')
+        with self.assertNumQueries(1):
+            user, _ = ProfileTokenAuthentication().authenticate(request)
+        self.assertEqual(user.caregiver_profile_id, self.caregiver.pk)
+        self.assertIsNone(user.owner_profile_id)
+
+    def test_token_authentication_rejects_bad_and_inactive_tokens(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token nope')
+        self.assertEqual(client.get('/api/payouts/').status_code, 401)
+        client = self._token_client(self.caregiver_user)
+        User.objects.filter(pk=self.caregiver_user.pk).update(is_active=False)
+        self.assertEqual(client.get('/api/payouts/').status_code, 401)
+
+    def test_profile_scoped_views_skip_the_user_join(self):
+        caregiver = self._token_client(self.caregiver_user)
+        with self.assertNumQueries(2):
+            self.assertEqual(caregiver.get('/api/payouts/').status_code, 200)
+        response = caregiver.post('/api/pets/', {'name': 'Rex', 'species': 'dog', 'sex': 'M'})
+        self.assertEqual(response.status_code, 403)
+        owner = self._token_client(self.owner_user)
+        with self.assertNumQueries(2):
+            response = owner.get('/api/pets/')
+        self.assertEqual([pet['id'] for pet in response.data], [str(self.pet.pk)])
+
+    def test_caregiver_filters_validate_and_match_a_single_service(self):
+        drop_in = ServiceType.objects.create(code='drop_in', name='Drop In', default_base_price=Decimal('15.00'))
+        CaregiverService.objects.create(caregiver=self.caregiver, service_type=drop_in, price_per_unit=Decimal('35.00'))
+        CaregiverProfile.objects.filter(pk=self.caregiver.pk).update(rating_average_bp=450)
+
+        def count(query):
+            response = self.client.get(f'/api/caregivers/?{query}')
+            self.assertEqual(response.status_code, 200, response.data)
+            return response.data['count']
+
+        self.assertEqual(count('service_type=drop_in&price_min=31'), 1)
+        self.assertEqual(count('service_type=drop_in&price_max=31'), 0)
+        self.assertEqual(count('price_min=10&price_max=40&city=NYC'), 1)
+        self.assertEqual(count('min_rating=4.5'), 1)
+        self.assertEqual(count('min_rating=4.51'), 0)
+        for query in ('price_min=abc', 'price_max=1e', 'min_rating=x'):
+            self.assertEqual(self.client.get(f'/api/caregivers/?{query}').status_code, 400, query)
+
+    @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+    def test_bulk_photo_upload_inserts_all_rows_at_once(self):
+        walk = WalkSession.objects.create(booking=self.booking)
+        caregiver = self._token_client(self.caregiver_user)
+        url = f'/api/walks/{walk.pk}/photos/bulk/'
+        with self.assertNumQueries(3):
+            response = caregiver.post(url, {'images': [_png(f'{idx}.png') for idx in range(3)]}, format='multipart')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(walk.photos.count(), 3)
+        self.assertEqual(caregiver.post(url, {}, format='multipart').status_code, 400)
+        bad_upload = SimpleUploadedFile('bad.png', b'not an image', content_type='image/png')
+        response = caregiver.post(url, {'images': [_png('ok.png'), bad_upload]}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(walk.photos.count(), 3)
+
+    def test_reviews_are_cursor_paginated_newest_first(self):
+        for idx in range(25):
+            booking = self._booking(days_ahead=idx + 1)
+            Review.objects.create(booking=booking, author=self.owner_user, target_caregiver=self.caregiver, rating=5)
+        client = self._token_client(self.owner_user)
+        with self.assertNumQueries(2):
+            first = client.get(f'/api/reviews/?caregiver={self.caregiver.pk}')
+        self.assertNotIn('count', first.data)
+        self.assertEqual(len(first.data['results']), 20)
+        second = client.get(first.data['next'])
+        self.assertEqual(len(second.data['results']), 5)
+        self.assertIsNone(second.data['next'])
+        created = [review['created_at'] for review in first.data['results'] + second.data['results']]
+        self.assertEqual(created, sorted(created, reverse=True))
+
+    def test_caregiver_list_query_count_is_flat(self):
+        drop_in = ServiceType.objects.create(code='drop_in', name='Drop In', default_base_price=Decimal('15.00'))
+        CaregiverService.objects.create(
+            caregiver=self.caregiver, service_type=drop_in, price_per_unit=Decimal('10.00'), is_active=False
+        )
+        for idx in range(5):
+            user = User.objects.create_user(username=f'care{idx}', password='pass')
+            profile = CaregiverProfile.objects.create(user=user, phone='5', city='NYC', hourly_rate_base=Decimal('20.00'))
+            CaregiverService.objects.create(caregiver=profile, service_type=self.service_type, price_per_unit=Decimal('40.00'))
+        # COUNT, the page of profiles, and one prefetch of active services with their service types.
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/caregivers/?ordering=min_price')
+        self.assertEqual(response.data['count'], 6)
+        first = response.data['results'][0]
+        self.assertEqual(first['id'], str(self.caregiver.pk))
+        self.assertEqual(first['min_price'], '30.00')
+        self.assertEqual([service['service_type']['code'] for service in first['services']], ['dog_walk'])
+
+    def test_caregiver_detail_accepts_list_ordering_keys(self):
+        for ordering in ('min_price', '-rating_average'):
+            response = self.client.get(f'/api/caregivers/{self.caregiver.pk}/?ordering={ordering}')
+            self.assertEqual(response.status_code, 200, ordering)
+
+    def test_caregiver_pages_are_stable_when_ratings_tie(self):
+        for idx in range(4):
+            user = User.objects.create_user(username=f'tied{idx}', password='pass')
+            CaregiverProfile.objects.create(user=user, phone='5', city='NYC', hourly_rate_base=Decimal('20.00'))
+        seen, url = [], '/api/caregivers/?page_size=2'
+        while url:
+            response = self.client.get(url)
+            seen += [caregiver['id'] for caregiver in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, sorted(str(pk) for pk in CaregiverProfile.objects.values_list('pk', flat=True)))
+
+    def test_caregiver_detail_cache_does_not_bypass_filters(self):
+        url = f'/api/caregivers/{self.caregiver.pk}/'
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.get(f'{url}?min_rating=4').status_code, 404)
@@ -2,18 +2,24 @@
 from __future__ import annotations
 
 from datetime import timedelta
-from decimal import Decimal
 
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import transaction
-from django.db.models import Q, Sum
+from django.db.models import F, Prefetch, Q, Sum
 from django.utils import timezone
 from rest_framework import generics, permissions, status, viewsets
 from rest_framework.authtoken.models import Token
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.generics import get_object_or_404
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.response import Response
 
+from .authentication import get_caregiver_profile_id, get_owner_profile_id
+from .filters import CaregiverFilter
 from .models import (
     Booking,
     CaregiverProfile,
@@ -26,6 +32,7 @@ from .models import (
     WalkSession,
     Payout,
     TransactionLog,
+    _ZERO,
 )
 from .serializers import (
     BookingCreateSerializer,
@@ -42,6 +49,13 @@ from .serializers import (
     FinanceSummarySerializer,
     TransactionLogSerializer,
 )
+from .services import CAREGIVER_DETAIL_CACHE_TIMEOUT, caregiver_detail_cache_key
+
+
+class CaregiverPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
 
 
 class RegisterOwnerView(generics.CreateAPIView):
@@ -85,12 +99,12 @@ class RegisterCaregiverView(generics.CreateAPIView):
                 city=request.data.get('city', ''),
                 bio=request.data.get('bio', ''),
                 years_experience=request.data.get('years_experience', 0),
-                hourly_rate_base=request.data.get('hourly_rate_base', Decimal('0.00')),
+                hourly_rate_base=request.data.get('hourly_rate_base', _ZERO),
                 services_offered=request.data.get('services_offered', []),
                 max_pets=request.data.get('max_pets', 1),
                 accepts_large_dogs=request.data.get('accepts_large_dogs', False),
                 accepts_aggressive=request.data.get('accepts_aggressive', False),
-                gps_radius_km=request.data.get('gps_radius_km', Decimal('0.00')),
+                gps_radius_km=request.data.get('gps_radius_km', _ZERO),
             )
         serializer = self.get_serializer(profile)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -102,42 +116,68 @@ def login_view(request):
     user = authenticate(username=request.data.get('username'), password=request.data.get('password'))
     if not user:
         return Response({'detail': 'Invalid credentials'}, status=status.HTTP_400_BAD_REQUEST)
-    token, _ = Token.objects.get_or_create(user=user)
+    token = Token.objects.filter(user_id=user.pk).only('key').first()
+    if token is None:
+        # First login only: get_or_create keeps the savepoint-guarded race handling off the hot path.
+        token, _ = Token.objects.get_or_create(user=user)
     return Response({'token': token.key})
 
 
 class MeView(generics.RetrieveAPIView):
     def get(self, request, *args, **kwargs):
-        data = {'user': User.objects.get(pk=request.user.pk).username}
-        try:
-            data['owner_profile'] = OwnerProfileSerializer(request.user.ownerprofile).data
-        except OwnerProfile.DoesNotExist:
-            data['owner_profile'] = None
-        try:
-            data['caregiver_profile'] = CaregiverProfileSerializer(request.user.caregiverprofile).data
-        except CaregiverProfile.DoesNotExist:
-            data['caregiver_profile'] = None
+        # Missing reverse one-to-ones are cached as absent by select_related, so hasattr stays query-free.
+        user = User.objects.select_related('ownerprofile', 'caregiverprofile').get(pk=request.user.pk)
+        data = {'user': user.username}
+        data['owner_profile'] = OwnerProfileSerializer(user.ownerprofile).data if hasattr(user, 'ownerprofile') else None
+        data['caregiver_profile'] = (
+            CaregiverProfileSerializer(user.caregiverprofile).data if hasattr(user, 'caregiverprofile') else None
+        )
         return Response(data)
 
 
-class PetViewSet(viewsets.ModelViewSet):
+class ProfileMixin:
+    """Expose the requesting user's profile ids, resolved during authentication."""
+
+    @property
+    def owner_profile_id(self):
+        return get_owner_profile_id(self.request.user)
+
+    @property
+    def caregiver_profile_id(self):
+        return get_caregiver_profile_id(self.request.user)
+
+
+class PetViewSet(ProfileMixin, viewsets.ModelViewSet):
     serializer_class = PetSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Pet.objects.filter(owner__user=self.request.user)
+        return Pet.objects.filter(owner_id=self.owner_profile_id)
 
     def perform_create(self, serializer):
-        serializer.save(owner=self.request.user.ownerprofile)
+        if self.owner_profile_id is None:
+            raise PermissionDenied('Only owners can add pets')
+        serializer.save(owner_id=self.owner_profile_id)
 
 
 class CaregiverViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = CaregiverProfile.objects.all().prefetch_related('services')
+    queryset = CaregiverProfile.objects.select_related('user').prefetch_related(
+        # A plain list attribute: serializers read it without cloning a queryset per caregiver, and
+        # profile.services.all() is left meaning every service rather than the filtered cache.
+        Prefetch(
+            'services',
+            queryset=CaregiverService.objects.select_related('service_type').filter(is_active=True),
+            to_attr='active_services',
+        )
+    )
     serializer_class = CaregiverListSerializer
     permission_classes = [permissions.AllowAny]
-    filterset_fields = ['city', 'accepts_large_dogs']
+    filterset_class = CaregiverFilter
     search_fields = ['user__username', 'city']
-    ordering_fields = ['rating_average', 'services__price_per_unit']
+    ordering_fields = ['rating_average', 'min_price']
+    # Unreviewed caregivers all tie on rating, so the id tiebreaker keeps page boundaries deterministic.
+    ordering = ['-rating_average', '-rating_count', 'id']
+    pagination_class = CaregiverPagination
 
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -145,25 +185,44 @@ class CaregiverViewSet(viewsets.ReadOnlyModelViewSet):
         return super().get_serializer_class()
 
     def get_queryset(self):
-        qs = super().get_queryset()
-        service_type = self.request.query_params.get('service_type')
-        min_rating = self.request.query_params.get('min_rating')
-        price_min = self.request.query_params.get('price_min')
-        price_max = self.request.query_params.get('price_max')
-        if service_type:
-            qs = qs.filter(services__service_type__code=service_type, services__is_active=True)
-        if min_rating:
-            qs = qs.filter(rating_average__gte=Decimal(min_rating))
-        if price_min:
-            qs = qs.filter(services__price_per_unit__gte=Decimal(price_min))
-        if price_max:
-            qs = qs.filter(services__price_per_unit__lte=Decimal(price_max))
-        return qs.distinct()
-
-
-class BookingViewSet(viewsets.ModelViewSet):
+        # Keep the public ordering keys usable for every action, since get_object filters and orders too:
+        # ratings are stored in hundredths, and the denormalized price sorts as an indexed column.
+        qs = super().get_queryset().alias(rating_average=F('rating_average_bp'), min_price=F('min_service_price'))
+        if self.action == 'list':
+            # The list serializer only exposes the user id, so skip the join and wide columns.
+            qs = qs.select_related(None).only(
+                'id', 'user_id', 'city', 'rating_average_bp', 'rating_count', 'accepts_large_dogs', 'min_service_price'
+            )
+        elif self.action == 'retrieve':
+            qs = qs.prefetch_related(
+                # Sliced prefetches are limited per caregiver in SQL with a window function.
+                Prefetch('reviews', queryset=Review.objects.select_related('author')[:10], to_attr='top_reviews'),
+                'availabilities',
+            )
+        return qs
+
+    def retrieve(self, request, *args, **kwargs):
+        if request.query_params:
+            # Filter parameters decide whether the caregiver resolves at all, so only plain requests are cached.
+            return super().retrieve(request, *args, **kwargs)
+        profile = get_object_or_404(CaregiverProfile.objects.only('updated_at'), pk=kwargs['pk'])
+        key = caregiver_detail_cache_key(profile.pk, profile.updated_at)
+        data = cache.get(key)
+        if data is None:
+            data = super().retrieve(request, *args, **kwargs).data
+            cache.set(key, data, CAREGIVER_DETAIL_CACHE_TIMEOUT)
+        return Response(data)
+
+
+# auth_user columns that UserSerializer never renders.
+UNRENDERED_USER_FIELDS = ('password', 'last_login', 'is_superuser', 'is_staff', 'is_active', 'date_joined')
+
+
+class BookingViewSet(ProfileMixin, viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
-    queryset = Booking.objects.select_related('owner', 'caregiver', 'pet', 'service_type')
+    queryset = Booking.objects.select_related('owner__user', 'caregiver__user', 'pet', 'service_type').defer(
+        *[f'{profile}__user__{field}' for profile in ('owner', 'caregiver') for field in UNRENDERED_USER_FIELDS]
+    )
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -174,59 +233,59 @@ class BookingViewSet(viewsets.ModelViewSet):
         qs = super().get_queryset()
         as_caregiver = self.request.query_params.get('as') == 'caregiver'
         if as_caregiver:
-            qs = qs.filter(caregiver__user=self.request.user)
+            qs = qs.filter(caregiver_id=self.caregiver_profile_id)
         else:
-            qs = qs.filter(owner__user=self.request.user)
+            qs = qs.filter(owner_id=self.owner_profile_id)
         status_filter = self.request.query_params.get('status')
         if status_filter:
             qs = qs.filter(status=status_filter)
         return qs
 
+    def _transition(self, new_status: str, permitted: Q) -> Response:
+        """Authorize and apply a status change in one UPDATE; only failures read the row."""
+        try:
+            updated = Booking.bulk_change_status(Booking.objects.filter(permitted, pk=self.kwargs['pk']), new_status)
+        except DjangoValidationError:
+            updated = 0
+        if updated:
+            return Response({'status': new_status})
+        # Like the UPDATE above this ignores ?as=, so a repeat action answers the same whichever side is viewed.
+        participant = Q(owner_id=self.owner_profile_id) | Q(caregiver_id=self.caregiver_profile_id)
+        booking = get_object_or_404(Booking.objects.filter(participant).only('status'), pk=self.kwargs['pk'])
+        if not Booking.objects.filter(permitted, pk=booking.pk).exists():
+            return Response(status=status.HTTP_403_FORBIDDEN)
+        return Response(
+            {'detail': f'Invalid transition from {booking.status} to {new_status}'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
     @action(detail=True, methods=['post'])
     def accept(self, request, pk=None):
-        booking = self.get_object()
-        if booking.caregiver.user != request.user:
-            return Response(status=status.HTTP_403_FORBIDDEN)
-        booking.change_status(Booking.STATUS_ACCEPTED)
-        return Response({'status': booking.status})
+        return self._transition(Booking.STATUS_ACCEPTED, Q(caregiver_id=self.caregiver_profile_id))
 
     @action(detail=True, methods=['post'])
     def reject(self, request, pk=None):
-        booking = self.get_object()
-        if booking.caregiver.user != request.user:
-            return Response(status=status.HTTP_403_FORBIDDEN)
-        booking.change_status(Booking.STATUS_REJECTED)
-        return Response({'status': booking.status})
+        return self._transition(Booking.STATUS_REJECTED, Q(caregiver_id=self.caregiver_profile_id))
 
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
-        booking = self.get_object()
-        if request.user not in (booking.owner.user, booking.caregiver.user):
-            return Response(status=status.HTTP_403_FORBIDDEN)
-        booking.change_status(Booking.STATUS_CANCELLED)
-        return Response({'status': booking.status})
+        return self._transition(Booking.STATUS_CANCELLED, Q(owner_id=self.owner_profile_id) | Q(caregiver_id=self.caregiver_profile_id))
 
     @action(detail=True, methods=['post'])
     def complete(self, request, pk=None):
-        booking = self.get_object()
-        if booking.caregiver.user != request.user:
-            return Response(status=status.HTTP_403_FORBIDDEN)
-        booking.change_status(Booking.STATUS_COMPLETED)
-        return Response({'status': booking.status})
+        return self._transition(Booking.STATUS_COMPLETED, Q(caregiver_id=self.caregiver_profile_id))
 
 
-class WalkSessionViewSet(viewsets.ModelViewSet):
+class WalkSessionViewSet(ProfileMixin, viewsets.ModelViewSet):
     serializer_class = WalkSessionSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return WalkSession.objects.filter(booking__caregiver__user=self.request.user)
-
-    def perform_create(self, serializer):
-        booking = serializer.validated_data['booking']
-        if booking.caregiver.user != self.request.user:
-            raise permissions.PermissionDenied('Not your booking')
-        serializer.save()
+        qs = WalkSession.objects.filter(booking__caregiver_id=self.caregiver_profile_id)
+        if self.action in ('photos', 'photos_bulk'):
+            # Upload actions only need the session row, not its existing photos.
+            return qs
+        return qs.prefetch_related('photos')
 
     @action(detail=True, methods=['post'])
     def photos(self, request, pk=None):
@@ -236,50 +295,68 @@ class WalkSessionViewSet(viewsets.ModelViewSet):
         serializer.save(session=session)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(detail=True, methods=['post'], url_path='photos/bulk')
+    def photos_bulk(self, request, pk=None):
+        session = self.get_object()
+        serializer = WalkPhotoSerializer(
+            data=[{'image': image} for image in request.FILES.getlist('images')], many=True, allow_empty=False
+        )
+        serializer.is_valid(raise_exception=True)
+        photos = WalkPhoto.objects.bulk_create(
+            [WalkPhoto(session=session, **item) for item in serializer.validated_data], batch_size=200
+        )
+        return Response(WalkPhotoSerializer(photos, many=True).data, status=status.HTTP_201_CREATED)
+
+
+class ReviewPagination(CursorPagination):
+    # Keyset pagination: each page is an index range scan instead of an ever-growing OFFSET.
+    ordering = '-created_at'
+    page_size = 20
+
 
 class ReviewViewSet(viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ReviewPagination
 
     def get_queryset(self):
         caregiver_id = self.request.query_params.get('caregiver')
-        qs = Review.objects.all()
+        qs = Review.objects.select_related('author')
         if caregiver_id:
             qs = qs.filter(target_caregiver_id=caregiver_id)
         return qs
 
 
-class PayoutViewSet(viewsets.ReadOnlyModelViewSet):
+class PayoutViewSet(ProfileMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = PayoutSerializer
 
     def get_queryset(self):
-        return Payout.objects.filter(caregiver__user=self.request.user)
+        return Payout.objects.filter(caregiver_id=self.caregiver_profile_id)
 
 
-class FinanceSummaryView(generics.GenericAPIView):
+class FinanceSummaryView(ProfileMixin, generics.GenericAPIView):
     serializer_class = FinanceSummarySerializer
 
     def get(self, request, *args, **kwargs):
-        caregiver = request.user.caregiverprofile
-        total_earnings = (
-            TransactionLog.objects.filter(user=request.user, direction=TransactionLog.DIRECTION_CREDIT)
-            .aggregate(total=Sum('amount'))['total']
-            or Decimal('0.00')
+        cutoff = timezone.now() - timedelta(days=30)
+        credits = TransactionLog.objects.filter(
+            user=request.user, direction=TransactionLog.DIRECTION_CREDIT
+        ).aggregate(
+            total=Sum('amount'),
+            last_30_days=Sum('amount', filter=Q(created_at__gte=cutoff)),
         )
         upcoming_payouts = (
-            Payout.objects.filter(caregiver=caregiver, status__in=[Payout.STATUS_PENDING, Payout.STATUS_PROCESSING])
+            Payout.objects.filter(
+                caregiver_id=self.caregiver_profile_id, status__in=[Payout.STATUS_PENDING, Payout.STATUS_PROCESSING]
+            )
             .aggregate(total=Sum('amount'))['total']
-            or Decimal('0.00')
-        )
-        last_30_days = (
-            TransactionLog.objects.filter(
-                user=request.user,
-                direction=TransactionLog.DIRECTION_CREDIT,
-                created_at__gte=timezone.now() - timedelta(days=30),
-            ).aggregate(total=Sum('amount'))['total']
-            or Decimal('0.00')
+            or _ZERO
         )
         serializer = self.get_serializer(
-            {'total_earnings': total_earnings, 'upcoming_payouts': upcoming_payouts, 'last_30_days': last_30_days}
+            {
+                'total_earnings': credits['total'] or _ZERO,
+                'upcoming_payouts': upcoming_payouts,
+                'last_30_days': credits['last_30_days'] or _ZERO,
+            }
         )
         return Response(serializer.data)